@@ -1,3 +1,6 @@
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
 from fastapi import Request, HTTPException, status
 import aiohttp
 
@@ -23,12 +26,35 @@ def get_authenticated_client(request: Request) -> aiohttp.ClientSession:
     Returns:
         aiohttp.ClientSession: The authenticated aiohttp session for making requests.
     """
-    if (
-        not hasattr(request.app.state, "http_client")
-        or request.app.state.http_client.closed
-    ):
+    client = getattr(request.app.state, "http_client", None)
+    if client is None or client.closed:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="No authenticated client session available.",
         )
-    return request.app.state.http_client
+    return client
+
+
+def date_range(
+    init_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Tuple[str, str]:
+    """
+    Dependency function to resolve the report date range query parameters.
+
+    Defaults are computed on every request, so a long-running server never
+    serves a stale range. Dates are formatted as DD/MM/YYYY, the format
+    expected by the target system.
+
+    Args:
+        init_date (Optional[date], optional): Start date for the search range. Defaults to 15 days ago.
+        end_date (Optional[date], optional): End date for the search range. Defaults to 30 days from today.
+
+    Returns:
+        Tuple[str, str]: The formatted start and end dates.
+    """
+    today = date.today()
+    init_date_str = (init_date or today - timedelta(days=15)).strftime("%d/%m/%Y")
+    end_date_str = (end_date or today + timedelta(days=30)).strftime("%d/%m/%Y")
+    return init_date_str, end_date_str
+
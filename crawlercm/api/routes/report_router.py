@@ -3,20 +3,28 @@ Routes for retrieving reports data via scraping.
 
 This module defines endpoints that trigger asynchronous scraping
 processes to fetch sales, production, and material-related reports
-from external systems. Each route manages its own date range defaults,
-formatting, and exception handling.
+from external systems. Date range defaults are resolved per request by the
+shared `deps.date_range` dependency; each route handles its own response
+formatting and exception handling.
 
 Endpoints:
     - /pending_sales → Fetches sales report data.
     - /pending_orders → Fetches pending production orders.
     - /pending_materials → Fetches pending material items.
+    - /filtered_sales_report → Fetches the combined sales report.
+    - /filtered_sales_report/export → Exports the combined report to Excel.
 """
 
+import asyncio
+import tempfile
 import aiohttp
-from typing import List, Optional
-from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from datetime import date
 
+from pydantic import TypeAdapter
 from fastapi import APIRouter, Depends, Request, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from api import deps
 from schemas.reports_schemas import (
@@ -26,26 +34,137 @@ from schemas.reports_schemas import (
     PendingOrdersItem,
 )
 from services.scrape_reports import (
+    SessionExpiredError,
+    combined_report_cache,
     get_combined_report_data,
+    pending_materials_cache,
     scrape_pending_materials,
     scrape_prod_pending_orders,
     scrape_sales_pending_orders,
 )
 from core.utils.format_excel import format_data_for_excel
+from core.utils.http_cache import cached_json_response
 from core.logger import logger
-from core.config import settings
+from core.config import get_settings
+from core.session_manager import ensure_fresh_auth
 
 router = APIRouter()
-init_date_str = (date.today() - timedelta(days=15)).strftime("%d/%m/%Y")
-end_date_str = (date.today() + timedelta(days=90)).strftime("%d/%m/%Y")
+settings = get_settings()
+EXCEL_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+EXCEL_CHUNK_SIZE = 64 * 1024
+_SALES_ADAPTER = TypeAdapter(List[SalesReportItem])
+_ORDERS_ADAPTER = TypeAdapter(List[PendingOrdersItem])
+_MATERIALS_ADAPTER = TypeAdapter(List[PendingMaterialsItem])
+_FILTERED_SALES_ADAPTER = TypeAdapter(List[FilteredSalesReportItem])
+_inflight_reports: Dict[Tuple[str, str, str], asyncio.Task] = {}
+T = TypeVar("T")
+
+
+async def _scrape_with_reauth(
+    request: Request, scrape: Callable[[Optional[str]], Awaitable[T]]
+) -> T:
+    """
+    Runs a scrape and, if the CM session expired, logs in again and retries once.
+
+    If no login has succeeded yet (e.g. the CM system was unreachable at
+    startup), authenticates before the first attempt instead of scraping
+    without a CSRF token.
+
+    Args:
+        request (Request): The FastAPI request object, used to access the auth state.
+        scrape (Callable[[Optional[str]], Awaitable[T]]): Coroutine factory
+            receiving the current CSRF token.
+
+    Returns:
+        T: The result of the scrape.
+    """
+    if request.app.state.csrf_token is None:
+        logger.warning("Not authenticated with CM yet, authenticating...")
+        await ensure_fresh_auth(request.app, None)
+
+    csrf_token = request.app.state.csrf_token
+    try:
+        return await scrape(csrf_token)
+    except SessionExpiredError:
+        logger.warning("CM session expired, authenticating again...")
+        await ensure_fresh_auth(request.app, csrf_token)
+        return await scrape(request.app.state.csrf_token)
+
+
+async def _fetch_combined(
+    client: aiohttp.ClientSession,
+    cache_key: Tuple[str, str, str],
+) -> List[FilteredSalesReportItem]:
+    """
+    Scrapes the combined report and stores non-empty results in the TTL cache.
+
+    Args:
+        client (aiohttp.ClientSession): An authenticated HTTP client.
+        cache_key (Tuple[str, str, str]): Start date, end date and CSRF token.
+
+    Returns:
+        List[FilteredSalesReportItem]: The combined report data.
+    """
+    init_date, end_date, csrf_token = cache_key
+    urls = {
+        "sales": settings.SALES_PENDING_ORDER_URL,
+        "prod": settings.PROD_PENDING_ORDER_URL,
+        "materials": settings.PENDING_MATERIALS_URL,
+    }
+    report_data = await get_combined_report_data(
+        client, urls, init_date, end_date, csrf_token
+    )
+    if report_data:
+        combined_report_cache.set(cache_key, report_data)
+    return report_data
+
+
+async def _get_or_fetch_combined(
+    client: aiohttp.ClientSession,
+    init_date: str,
+    end_date: str,
+    csrf_token: str,
+) -> List[FilteredSalesReportItem]:
+    """
+    Returns the combined report from the TTL cache or scrapes it once.
+
+    Concurrent requests for the same date range share a single in-flight
+    scrape (single-flight), so the JSON and Excel routes never hit the
+    external system twice for the same data.
+
+    Args:
+        client (aiohttp.ClientSession): An authenticated HTTP client.
+        init_date (str): Start date in "DD/MM/YYYY" format.
+        end_date (str): End date in "DD/MM/YYYY" format.
+        csrf_token (str): CSRF token required by the production report.
+
+    Returns:
+        List[FilteredSalesReportItem]: The combined report data.
+    """
+    cache_key = (init_date, end_date, csrf_token)
+    report_data = combined_report_cache.get(cache_key)
+    if report_data is not None:
+        return report_data
 
+    task = _inflight_reports.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(_fetch_combined(client, cache_key))
+        _inflight_reports[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_reports.pop(cache_key, None))
 
-@router.get("/pending_sales", response_model=List[SalesReportItem])
+    return await asyncio.shield(task)
+
+
+@router.get(
+    "/pending_sales",
+    response_model=None,
+    responses={200: {"model": List[SalesReportItem]}},
+)
 async def get_sales_pending_orders(
+    request: Request,
     client: aiohttp.ClientSession = Depends(deps.get_authenticated_client),
-    init_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-) -> List[SalesReportItem]:
+    dates: Tuple[str, str] = Depends(deps.date_range),
+) -> Response:
     """
     Fetches sales orders via scraping.
 
@@ -55,49 +174,54 @@ async def get_sales_pending_orders(
     formatted as DD/MM/YYYY before being sent to the target system.
 
     Args:
+        request (Request): The FastAPI request object. Used to access app state data and conditional request headers.
         client (aiohttp.ClientSession): An authenticated HTTP client injected via dependency.
-        init_date (Optional[date], optional): Start date for the search range. Defaults to 15 days ago.
-        end_date (Optional[date], optional): End date for the search range. Defaults to 30 days from today.
+        dates (Tuple[str, str]): Start and end dates of the search range, resolved by `deps.date_range`.
 
     Returns:
-        List[SalesReportItem]: A list of sales orders retrieved from the external system.
+        Response: A JSON list of sales orders retrieved from the external system.
 
     Raises:
         HTTPException: If any error occurs during the scraping process.
     """
+    init_date_str, end_date_str = dates
     try:
-        if init_date is None:
-            init_date = init_date_str
-        else:
-            init_date = init_date.strftime("%d/%m/%Y")
-
-        if end_date is None:
-            end_date = end_date_str
-        else:
-            end_date = end_date.strftime("%d/%m/%Y")
-
         logger.info("Fetching sales pending orders...")
-        report_data = await scrape_sales_pending_orders(
-            client, settings.SALES_PENDING_ORDER_URL, init_date_str, end_date_str
+        report_data = await _scrape_with_reauth(
+            request,
+            lambda _: scrape_sales_pending_orders(
+                client, settings.SALES_PENDING_ORDER_URL, init_date_str, end_date_str
+            ),
         )
         if not report_data:
             raise HTTPException(
                 status_code=404, detail="No sales pending orders found."
             )
         logger.info("Sales pending orders fetched successfully!")
-        return report_data
+        return cached_json_response(request, report_data, _SALES_ADAPTER)
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Upstream timeout fetching sales pending orders")
+        raise HTTPException(status_code=504, detail="Timed out fetching sales pending orders")
+    except aiohttp.ClientError as e:
+        logger.warning(f"Upstream error fetching sales pending orders: {e}")
+        raise HTTPException(status_code=502, detail=f"Error fetching sales pending orders: {e}")
     except Exception as e:
-        logger.error(f"Error fetching sales pending orders: {e}")
+        logger.exception(f"Error fetching sales pending orders: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching sales pending orders: {e}")
 
 
-@router.get("/pending_orders", response_model=List[PendingOrdersItem])
+@router.get(
+    "/pending_orders",
+    response_model=None,
+    responses={200: {"model": List[PendingOrdersItem]}},
+)
 async def get_prod_pending_orders(
     request: Request,
     client: aiohttp.ClientSession = Depends(deps.get_authenticated_client),
-    init_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-) -> List[PendingOrdersItem]:
+    dates: Tuple[str, str] = Depends(deps.date_range),
+) -> Response:
     """
     Fetches pending production orders via scraping.
 
@@ -112,35 +236,27 @@ async def get_prod_pending_orders(
     Args:
         request (Request): The FastAPI request object. Used to access app state data (e.g., CSRF token).
         client (aiohttp.ClientSession): An authenticated HTTP client injected via dependency.
-        init_date (Optional[date], optional): Start date for the search range. Defaults to 15 days ago.
-        end_date (Optional[date], optional): End date for the search range. Defaults to 30 days from today.
+        dates (Tuple[str, str]): Start and end dates of the search range, resolved by `deps.date_range`.
 
     Returns:
-        List[PendingOrdersItem]: A list of pending production orders retrieved from the external system.
+        Response: A JSON list of pending production orders retrieved from the external system.
 
     Raises:
         HTTPException: If any error occurs during the scraping process.
     """
 
+    init_date_str, end_date_str = dates
     try:
-        if init_date is None:
-            init_date = init_date_str
-        else:
-            init_date = init_date.strftime("%d/%m/%Y")
-
-        if end_date is None:
-            end_date = end_date_str
-        else:
-            end_date = end_date.strftime("%d/%m/%Y")
-
         logger.info("Fetching production pending orders...")
-        csrf_token = request.app.state.csrf_token
-        report_data = await scrape_prod_pending_orders(
-            client,
-            settings.PROD_PENDING_ORDER_URL,
-            init_date_str,
-            end_date_str,
-            csrf_token,
+        report_data = await _scrape_with_reauth(
+            request,
+            lambda csrf_token: scrape_prod_pending_orders(
+                client,
+                settings.PROD_PENDING_ORDER_URL,
+                init_date_str,
+                end_date_str,
+                csrf_token,
+            ),
         )
 
         if not report_data:
@@ -149,16 +265,29 @@ async def get_prod_pending_orders(
             )
 
         logger.info("Production pending orders fetched successfully!")
-        return report_data
+        return cached_json_response(request, report_data, _ORDERS_ADAPTER)
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Upstream timeout fetching production pending orders")
+        raise HTTPException(status_code=504, detail="Timed out fetching production pending orders")
+    except aiohttp.ClientError as e:
+        logger.warning(f"Upstream error fetching production pending orders: {e}")
+        raise HTTPException(status_code=502, detail=f"Error fetching production pending orders: {e}")
     except Exception as e:
-        logger.error(f"Error fetching production pending orders: {e}")
+        logger.exception(f"Error fetching production pending orders: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching production pending orders: {e}")
 
 
-@router.get("/pending_materials", response_model=List[PendingMaterialsItem])
+@router.get(
+    "/pending_materials",
+    response_model=None,
+    responses={200: {"model": List[PendingMaterialsItem]}},
+)
 async def get_pending_materials(
+    request: Request,
     client: aiohttp.ClientSession = Depends(deps.get_authenticated_client),
-) -> List[PendingMaterialsItem]:
+) -> Response:
     """
     Fetches pending material items via scraping.
 
@@ -167,37 +296,56 @@ async def get_pending_materials(
     previously authenticated client session.
 
     Args:
+        request (Request): The FastAPI request object. Used to access app state data and conditional request headers.
         client (aiohttp.ClientSession): An authenticated HTTP client injected via dependency.
 
     Returns:
-        List[PendingMaterialsItem]: A list of pending materials retrieved from the external system.
+        Response: A JSON list of pending materials retrieved from the external system.
 
     Raises:
         HTTPException: If any error occurs during the scraping process.
     """
     try:
         logger.info("Fetching pending materials...")
-        report_data = await scrape_pending_materials(
-            client, settings.PENDING_MATERIALS_URL
-        )
+        report_data = pending_materials_cache.get(settings.PENDING_MATERIALS_URL)
+        if report_data is None:
+            report_data = await _scrape_with_reauth(
+                request,
+                lambda _: scrape_pending_materials(
+                    client, settings.PENDING_MATERIALS_URL
+                ),
+            )
+            if report_data:
+                pending_materials_cache.set(settings.PENDING_MATERIALS_URL, report_data)
 
         if not report_data:
             raise HTTPException(status_code=404, detail="No pending materials found.")
 
         logger.info("Pending materials fetched successfully!")
-        return report_data
+        return cached_json_response(request, report_data, _MATERIALS_ADAPTER)
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Upstream timeout fetching pending materials")
+        raise HTTPException(status_code=504, detail="Timed out fetching pending materials")
+    except aiohttp.ClientError as e:
+        logger.warning(f"Upstream error fetching pending materials: {e}")
+        raise HTTPException(status_code=502, detail=f"Error fetching pending materials: {e}")
     except Exception as e:
-        logger.error(f"Error fetching pending materials: {e}")
+        logger.exception(f"Error fetching pending materials: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching pending materials: {e}")
 
 
-@router.get("/filtered_sales_report", response_model=List[FilteredSalesReportItem])
+@router.get(
+    "/filtered_sales_report",
+    response_model=None,
+    responses={200: {"model": List[FilteredSalesReportItem]}},
+)
 async def get_filtered_sales_report(
     request: Request,
     client: aiohttp.ClientSession = Depends(deps.get_authenticated_client), 
-    init_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-) -> List[FilteredSalesReportItem]:
+    dates: Tuple[str, str] = Depends(deps.date_range),
+) -> Response:
     """
     Fetches pending sales, orders and  material items via scraping.
 
@@ -208,49 +356,42 @@ async def get_filtered_sales_report(
     Args:
         request (Request): The FastAPI request object. Used to access app state data (e.g., CSRF token).
         client (aiohttp.ClientSession): An authenticated HTTP client injected via dependency.
-        init_date (Optional[date], optional): Start date for the search range. Defaults to 15 days ago.
-        end_date (Optional[date], optional): End date for the search range. Defaults to 30 days from today.
+        dates (Tuple[str, str]): Start and end dates of the search range, resolved by `deps.date_range`.
         
     Returns:
-        List[FilteredSalesReportItem]: A list of pending sales, orders and  material items retrieved from the external system.
+        Response: A JSON list of pending sales, orders and  material items retrieved from the external system.
 
     Raises:
         HTTPException: If any error occurs during the scraping process.
     """
+    init_date_str, end_date_str = dates
     try:
-        if init_date is None:
-            init_date = init_date_str
-        else:
-            init_date = init_date.strftime("%d/%m/%Y")
-
-        if end_date is None:
-            end_date = end_date_str
-        else:
-            end_date = end_date.strftime("%d/%m/%Y")
-
         logger.info("Fetching combining sales reports...")
-        urls = {
-            "sales": settings.SALES_PENDING_ORDER_URL,
-            "prod": settings.PROD_PENDING_ORDER_URL,
-            "materials": settings.PENDING_MATERIALS_URL
-        }
-        csrf_token = request.app.state.csrf_token
-
-        report_data = await get_combined_report_data(
-            client, urls, init_date, end_date, csrf_token
+        report_data = await _scrape_with_reauth(
+            request,
+            lambda csrf_token: _get_or_fetch_combined(
+                client, init_date_str, end_date_str, csrf_token
+            ),
         )
         logger.info("Sales filtered report fetched successfully!")
-        return report_data
+        return cached_json_response(request, report_data, _FILTERED_SALES_ADAPTER)
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Upstream timeout fetching sales filtered report")
+        raise HTTPException(status_code=504, detail="Timed out fetching sales filtered report")
+    except aiohttp.ClientError as e:
+        logger.warning(f"Upstream error fetching sales filtered report: {e}")
+        raise HTTPException(status_code=502, detail=f"Error fetching sales filtered report: {e}")
     except Exception as e:
-        logger.error(f"Error fetching sales filtered report: {e}")
+        logger.exception(f"Error fetching sales filtered report: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching sales filtered report: {e}")
     
 @router.get("/filtered_sales_report/export", tags=["Consolidated Reports"])
 async def export_filtered_sales_report(
     request: Request,
     client: aiohttp.ClientSession = Depends(deps.get_authenticated_client),
-    init_date: Optional[date] = None,
-    end_date: Optional[date] = None,
+    dates: Tuple[str, str] = Depends(deps.date_range),
 ):
     """
     Fetches sales, order, and pending material data and exports it to an Excel file.
@@ -262,49 +403,47 @@ async def export_filtered_sales_report(
     Args:
         request (Request): The FastAPI request object.
         client (aiohttp.ClientSession): An authenticated HTTP client injected via dependency.
-        init_date (Optional[date]): The start date for the filter. Defaults to 15 days ago.
-        end_date (Optional[date]): The end date for the filter. Defaults to 30 days from today.
+        dates (Tuple[str, str]): Start and end dates of the filter, resolved by `deps.date_range`.
         
     Returns:
-        Response: A FastAPI Response object containing the generated Excel file for download.
+        StreamingResponse: A response streaming the generated Excel file for download.
 
     Raises:
         HTTPException: If an error occurs during the scraping or file generation process.
     """
-    if init_date is None:
-        init_date = init_date_str
-    else:
-        init_date = init_date.strftime("%d/%m/%Y")
-
-    if end_date is None:
-        end_date = end_date_str
-    else:
-        end_date = end_date.strftime("%d/%m/%Y")
-    
+    init_date_str, end_date_str = dates
+
     try:
-        urls = {
-            "sales": settings.SALES_PENDING_ORDER_URL,
-            "prod": settings.PROD_PENDING_ORDER_URL,
-            "materials": settings.PENDING_MATERIALS_URL,
-        }
-        csrf_token = request.app.state.csrf_token
-        
-        report_data = await get_combined_report_data(
-            client, urls, init_date_str, end_date_str, csrf_token
+        report_data = await _scrape_with_reauth(
+            request,
+            lambda csrf_token: _get_or_fetch_combined(
+                client, init_date_str, end_date_str, csrf_token
+            ),
         )
-        logger.info("Getting excel bytes for filtered sales report...")
-        excel_bytes = format_data_for_excel(report_data)
+        logger.info("Writing excel file for filtered sales report...")
+        excel_file = tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_SIZE)
+        format_data_for_excel(report_data, stream=excel_file)
+        excel_file.seek(0)
         file_name = f"relatorio_carteira_{date.today().strftime('%Y-%m-%d')}.xlsx"
         media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         headers = {
             'Content-Disposition': f'attachment; filename="{file_name}"'
         }
         logger.info("Excel file generated successfully!")
-        return Response(
-            content=excel_bytes,
+        return StreamingResponse(
+            iter(lambda: excel_file.read(EXCEL_CHUNK_SIZE), b""),
             media_type=media_type,
-            headers=headers
+            headers=headers,
+            background=BackgroundTask(excel_file.close),
         )
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Upstream timeout exporting filtered sales report")
+        raise HTTPException(status_code=504, detail="Timed out exporting report")
+    except aiohttp.ClientError as e:
+        logger.warning(f"Upstream error exporting filtered sales report: {e}")
+        raise HTTPException(status_code=502, detail=f"Failed to export report: {e}")
     except Exception as e:
-        logger.error(f"Error exporting filtered sales report: {e}")
+        logger.exception(f"Error exporting filtered sales report: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to export report: {e}")
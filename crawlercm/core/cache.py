@@ -0,0 +1,82 @@
+"""
+In-memory time-based cache used to reuse scraped report data.
+
+Scraping the CM system is the dominant latency source of the API, so
+results that are requested repeatedly within a short window (UI polling,
+"view then export" workflows) are kept here for a few seconds instead of
+being fetched again from the external system.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Small LRU cache whose entries expire after a fixed time-to-live.
+
+    Entries are stored alongside the monotonic timestamp at which they
+    expire. Expired entries are dropped lazily on lookup, and the least
+    recently used entry is evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 60.0) -> None:
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept in memory.
+            ttl (float): Time-to-live of each entry, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for `key`, or None if missing or expired.
+
+        Args:
+            key (Hashable): Cache key.
+
+        Returns:
+            Optional[Any]: The cached value, or None.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store `value` under `key` for the configured time-to-live.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to cache.
+        """
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove `key` from the cache, if present.
+
+        Args:
+            key (Hashable): Cache key.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+        """
+        self._data.clear()
@@ -1,7 +1,12 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+
     LOGIN_URL: str
     HOME_URL: str
     SALES_PENDING_ORDER_URL: str
@@ -9,9 +14,18 @@ class Settings(BaseSettings):
     PENDING_MATERIALS_URL: str
     USERNAME: str
     PASSWORD: str
+    HTTP_POOL_LIMIT: int = 1000
+    HTTP_POOL_PER_HOST: int = 64
+    SCRAPE_CONCURRENCY: int = 8
+    SCRAPE_RETRIES: int = Field(default=3, ge=1)
 
-    class Config:
-        env_file = ".env"
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the application settings, loading them only once.
 
-settings = Settings()
+    Returns:
+        Settings: The cached settings instance.
+    """
+    return Settings()
@@ -0,0 +1,36 @@
+"""
+ASGI middleware used by the API.
+"""
+
+from typing import Iterable
+
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves selected paths uncompressed.
+
+    The Excel export is already a zip container, so compressing it again
+    only burns CPU on every download; its path is passed straight through
+    while the JSON report routes are still compressed.
+    """
+
+    def __init__(
+        self, app: ASGIApp, excluded_paths: Iterable[str] = (), **kwargs
+    ) -> None:
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            excluded_paths (Iterable[str]): Request paths served without gzip.
+            **kwargs: Extra arguments forwarded to `GZipMiddleware`.
+        """
+        super().__init__(app, **kwargs)
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -1,71 +1,176 @@
+import asyncio
+import re
 import sys
 import aiohttp
 from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
-from bs4 import BeautifulSoup
-from core.config import settings
+from core.config import get_settings
 from core.logger import logger
+from services.scrape_reports import pending_materials_cache, scrape_pending_materials
 
+settings = get_settings()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+# Matches the Yii CSRF hidden input in either attribute order.
+CSRF_RE = re.compile(
+    rb'YII_CSRF_TOKEN["\'][^>]*?value=["\']([^"\']+)["\']'
+    rb'|value=["\']([^"\']+)["\'][^>]*?name=["\']YII_CSRF_TOKEN',
+    re.IGNORECASE,
+)
+
+
+class LoginError(Exception):
     """
-    Application lifespan handler.
+    Raised when the CM login page or the login itself is rejected.
 
-    Handles initialization and shutdown tasks:
-      - Creates an aiohttp session
-      - Retrieves CSRF token from login page
-      - Authenticates with the target system
-      - Closes session on shutdown
+    Unlike network errors and timeouts, this is not transient: the
+    credentials or the login page changed, so the application cannot work.
     """
-    logger.info("Initializing aiohttp session...")
-    session = aiohttp.ClientSession()
 
+
+def make_session() -> aiohttp.ClientSession:
+    """
+    Create the aiohttp session shared by the login flow and every scrape.
+
+    The session owns a pooled TCP connector with keep-alive and DNS caching,
+    so report requests (including retries) reuse open connections instead of
+    paying a new TCP/TLS handshake each time.
+
+    Returns:
+        aiohttp.ClientSession: A new client session.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=int(settings.HTTP_POOL_LIMIT),
+        limit_per_host=int(settings.HTTP_POOL_PER_HOST),
+        keepalive_timeout=75,
+        enable_cleanup_closed=True,
+        ttl_dns_cache=300,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=60, sock_connect=10),
+    )
+
+
+async def _warmup(session: aiohttp.ClientSession) -> None:
+    """
+    Pre-fetch the pending materials report right after login.
+
+    Warms the connection pool, DNS cache and the pending materials TTL cache
+    so the first user request is not a cold one. Failures are only logged.
+    """
     try:
-        # Step 1: Get CSRF Token
-        logger.info(f"Accessing {settings.LOGIN_URL} to get CSRF token...")
-        async with session.get(settings.LOGIN_URL) as response:
-            response.raise_for_status()
-            html_content = await response.text()
+        logger.info("Warming up pending materials cache...")
+        report_data = await scrape_pending_materials(
+            session, settings.PENDING_MATERIALS_URL
+        )
+        if report_data:
+            pending_materials_cache.set(settings.PENDING_MATERIALS_URL, report_data)
+        logger.info("Warm-up finished.")
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
 
-        soup = BeautifulSoup(html_content, "html.parser")
-        csrf_input = soup.find("input", {"name": "YII_CSRF_TOKEN"})
 
-        if not csrf_input or "value" not in csrf_input.attrs:
-            raise IOError("Could not find CSRF token input on login page.")
+async def refresh_auth(session: aiohttp.ClientSession, app: FastAPI) -> None:
+    """
+    Run the CSRF + login flow and store the new token in `app.state`.
 
-        csrf_token = csrf_input["value"]
-        logger.info("CSRF token extracted successfully!")
+    Args:
+        session (aiohttp.ClientSession): The shared aiohttp session.
+        app (FastAPI): The application whose state receives the token.
 
-        app.state.csrf_token = csrf_token
+    Raises:
+        aiohttp.ClientError: If the login page or the login request fails.
+        asyncio.TimeoutError: If the login flow exceeds the session timeout.
+        LoginError: If the CSRF token cannot be found or the login is rejected.
+    """
+    # Step 1: Get CSRF Token
+    logger.info(f"Accessing {settings.LOGIN_URL} to get CSRF token...")
+    async with session.get(settings.LOGIN_URL) as response:
+        response.raise_for_status()
+        raw_html = await response.read()
 
-        # Step 2: Perform login
-        login_payload = {
-            "YII_CSRF_TOKEN": csrf_token,
-            "LoginForm[username]": settings.USERNAME,
-            "LoginForm[password]": settings.PASSWORD,
-            "LoginForm[codigoConexao]": "3.1~13,3^17,7",
-            "yt0": "Entrar",
-        }
+    match = CSRF_RE.search(raw_html)
+    if not match:
+        raise LoginError("Could not find CSRF token input on login page.")
 
-        logger.info("Sending login request...")
-        async with session.post(settings.LOGIN_URL, data=login_payload) as response:
-            response.raise_for_status()
-            if response.status != 200:
-                raise IOError(f"Login failed: HTTP {response.status}")
+    csrf_token = (match.group(1) or match.group(2)).decode()
+    logger.info("CSRF token extracted successfully!")
 
-        logger.info("✅ Login successful! Scraper ready.")
-        app.state.http_client = session
+    # Step 2: Perform login
+    login_payload = {
+        "YII_CSRF_TOKEN": csrf_token,
+        "LoginForm[username]": settings.USERNAME,
+        "LoginForm[password]": settings.PASSWORD,
+        "LoginForm[codigoConexao]": "3.1~13,3^17,7",
+        "yt0": "Entrar",
+    }
 
-        # Yield control to app runtime
-        yield
+    logger.info("Sending login request...")
+    async with session.post(settings.LOGIN_URL, data=login_payload) as response:
+        response.raise_for_status()
+        if response.status != 200:
+            raise LoginError(f"Login failed: HTTP {response.status}")
 
-    except (aiohttp.ClientError, IOError) as e:
+    app.state.csrf_token = csrf_token
+    logger.info("✅ Login successful! Scraper ready.")
+
+
+async def ensure_fresh_auth(app: FastAPI, stale_token: Optional[str]) -> None:
+    """
+    Re-authenticate once after the CM session expired.
+
+    Concurrent callers that saw the same expired token are serialized by
+    `app.state.auth_lock`; only the first one logs in again, the others
+    find a new token already in place and return immediately.
+
+    Args:
+        app (FastAPI): The application holding the session and auth state.
+        stale_token (Optional[str]): The CSRF token that was rejected.
+    """
+    async with app.state.auth_lock:
+        if app.state.csrf_token == stale_token:
+            await refresh_auth(app.state.http_client, app)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan handler.
+
+    Handles initialization and shutdown tasks:
+      - Creates an aiohttp session backed by a pooled TCP connector
+      - Retrieves CSRF token from login page and authenticates with the
+        target system (retried on demand if the network is unavailable)
+      - Warms up the pending materials cache in the background
+      - Closes session on shutdown
+    """
+    logger.info("Initializing aiohttp session...")
+    session = make_session()
+    app.state.http_client = session
+    app.state.auth_lock = asyncio.Lock()
+    app.state.csrf_token = None
+
+    try:
+        await refresh_auth(session, app)
+        app.state.warmup_task = asyncio.create_task(_warmup(session))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.exception(
+            f"❌ Could not authenticate during initialization, will retry on demand: {e}"
+        )
+    except LoginError as e:
         logger.exception(f"❌ Critical Error during initialization: {e}")
         await session.close()
         sys.exit("Application terminated due to authentication failure.")
 
+    try:
+        # Yield control to app runtime
+        yield
     finally:
-        if hasattr(app.state, "http_client") and not app.state.http_client.closed:
-            await app.state.http_client.close()
+        warmup_task = getattr(app.state, "warmup_task", None)
+        if warmup_task and not warmup_task.done():
+            warmup_task.cancel()
+        http_client = getattr(app.state, "http_client", None)
+        if http_client is not None and not http_client.closed:
+            await http_client.close()
             logger.warning("Aiohttp session closed gracefully.")
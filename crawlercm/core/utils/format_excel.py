@@ -1,87 +1,134 @@
+from datetime import date
+from functools import lru_cache
 from io import BytesIO
-from typing import List
+from typing import BinaryIO, List, Optional
 
-import pandas as pd
-from schemas.reports_schemas import FilteredSalesReportItem
+import xlsxwriter
+from schemas.reports_schemas import FilteredSalesReportItem, PendingMaterialsItem
 
-def format_data_for_excel(report_data: List[FilteredSalesReportItem]) -> bytes:
+HEADER_MAPPING = {
+    "negociacao": "Negociação",
+    "pedido_cliente": "Pedido do Cliente",
+    "op": "Ordem de Produção (OP)",
+    "tipo_servico": "Tipo de Serviço",
+    "numero_projeto": "Nº do Projeto",
+    "codigo": "Código do Produto",
+    "produto": "Descrição do Produto",
+    "previsao": "Previsão de Entrega",
+    "qtde_pendente": "Qtde. Pendente",
+    "valor_unitario": "Valor Unitário (R$)",
+    "ipi": "IPI (%)",
+    "valor_total": "Valor Total (R$)",
+    "etapa": "Etapa Atual",
+    "materiais_pendentes": "Materiais Pendentes"
+}
+
+MATERIAL_TEMPLATE = "Cod.: {c} | Qtde. Pendente: {p} | STATUS: {s} | PREV: {d}".format
+
+
+@lru_cache(maxsize=1024)
+def _format_date(value: Optional[date]) -> str:
     """
-    Converte a lista de dados consolidados em um DataFrame do Pandas,
-    formatando colunas complexas para melhor visualização no Excel.
+    Formata uma data como DD/MM/YYYY, memorizando as datas já formatadas.
+    """
+    return value.strftime('%d/%m/%Y') if value else 'N/A'
+
+
+def _format_materials(materiais: List[PendingMaterialsItem]) -> str:
     """
-    if not report_data:
-        return pd.DataFrame()
-
-    header_mapping = {
-        "negociacao": "Negociação",
-        "pedido_cliente": "Pedido do Cliente",
-        "op": "Ordem de Produção (OP)",
-        "tipo_servico": "Tipo de Serviço",
-        "numero_projeto": "Nº do Projeto",
-        "codigo": "Código do Produto",
-        "produto": "Descrição do Produto",
-        "previsao": "Previsão de Entrega",
-        "qtde_pendente": "Qtde. Pendente",
-        "valor_unitario": "Valor Unitário (R$)",
-        "ipi": "IPI (%)",
-        "valor_total": "Valor Total (R$)",
-        "etapa": "Etapa Atual",
-        "materiais_pendentes": "Materiais Pendentes"
+    Concatena os materiais pendentes de um item em uma única célula de texto.
+    """
+    return "; \n".join(
+        MATERIAL_TEMPLATE(
+            c=mat.codigo, p=mat.pendente, s=mat.situacao, d=_format_date(mat.previsao_mp)
+        )
+        for mat in materiais or []
+    )
+
+
+def format_data_for_excel(
+    report_data: List[FilteredSalesReportItem],
+    stream: Optional[BinaryIO] = None,
+) -> Optional[bytes]:
+    """
+    Converte a lista de dados consolidados em uma planilha Excel.
+
+    As linhas são escritas diretamente com o xlsxwriter em modo de memória
+    constante, sem montar um DataFrame intermediário, e a largura das colunas
+    é calculada na mesma passagem.
+
+    Se `stream` for informado, a planilha é gravada nele e nada é retornado;
+    caso contrário, os bytes do arquivo são retornados.
+    """
+    columns = list(HEADER_MAPPING)
+    headers = list(HEADER_MAPPING.values())
+
+    output = stream if stream is not None else BytesIO()
+    workbook = xlsxwriter.Workbook(
+        output, {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy'}
+    )
+    worksheet = workbook.add_worksheet('RelatorioVendas')
+
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    currency_format = workbook.add_format({'num_format': 'R$ #,##0.00'})
+    integer_format = workbook.add_format({'num_format': '0'})
+    date_format = workbook.add_format({'num_format': 'dd/mm/yyyy', 'align': 'left'})
+    text_wrap_format = workbook.add_format({'text_wrap': True, 'valign': 'top'})
+
+    column_formats = {
+        "previsao": date_format,
+        "qtde_pendente": integer_format,
+        "valor_unitario": currency_format,
+        "valor_total": currency_format,
+        "materiais_pendentes": text_wrap_format,
     }
+    formats = [column_formats.get(col) for col in columns]
+    widths = [len(header) for header in headers]
 
-    dados_para_df = [item.model_dump() for item in report_data]
-    for item in dados_para_df:
-        materiais_str_list = []
-        for mat in item.get('materiais_pendentes', []):
-            code = mat.get('codigo', 'N/A')
-            pendente = mat.get('pendente', 'N/A')
-            situacao = mat.get('situacao', 'N/A')
-            previsao_mp = mat.get('previsao_mp', 'N/A')
-            if previsao_mp != 'N/A' and hasattr(previsao_mp, 'strftime'):
-                formated_date = previsao_mp.strftime('%d/%m/%Y')
+    worksheet.write_row(0, 0, headers, header_format)
+
+    for row_idx, item in enumerate(report_data, start=1):
+        row = (
+            item.negociacao,
+            item.pedido_cliente,
+            item.op,
+            item.tipo_servico,
+            item.numero_projeto,
+            item.codigo,
+            item.produto,
+            item.previsao,
+            item.qtde_pendente,
+            item.valor_unitario,
+            item.ipi,
+            item.valor_total,
+            item.etapa,
+            _format_materials(item.materiais_pendentes),
+        )
+
+        for col_idx, value in enumerate(row):
+            if value is None or value == "":
+                continue
+
+            worksheet.write(row_idx, col_idx, value, formats[col_idx])
+            if isinstance(value, date):
+                value_len = 10
             else:
-                formated_date = 'N/A'
-            materiais_str_list.append(f"Cod.: {code} | Qtde. Pendente: {pendente} | STATUS: {situacao} | PREV: {formated_date}")
-        item['materiais_pendentes'] = "; \n".join(materiais_str_list) if materiais_str_list else ""
-    df = pd.DataFrame(dados_para_df)
-    df.rename(columns=header_mapping, inplace=True)
-    
-    if "Previsão de Entrega" in df.columns:
-        df["Previsão de Entrega"] = pd.to_datetime(df["Previsão de Entrega"])
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter', datetime_format='dd/mm/yyyy') as writer:
-        df.to_excel(writer, sheet_name='RelatorioVendas', index=False)
-
-        workbook = writer.book
-        worksheet = writer.sheets['RelatorioVendas']
-
-        currency_format = workbook.add_format({'num_format': 'R$ #,##0.00'})
-        integer_format = workbook.add_format({'num_format': '0'})
-        date_format = workbook.add_format({'num_format': 'dd/mm/yyyy', 'align': 'left'})
-        text_wrap_format = workbook.add_format({'text_wrap': True, 'valign': 'top'})
-
-        col_map = {col: i for i, col in enumerate(df.columns)}
-
-        if "Valor Unitário (R$)" in col_map:
-            worksheet.set_column(col_map["Valor Unitário (R$)"], col_map["Valor Unitário (R$)"], None, currency_format)
-        if "Valor Total (R$)" in col_map:
-            worksheet.set_column(col_map["Valor Total (R$)"], col_map["Valor Total (R$)"], None, currency_format)
-        if "Qtde. Pendente" in col_map:
-            worksheet.set_column(col_map["Qtde. Pendente"], col_map["Qtde. Pendente"], None, integer_format)
-        if "Previsão de Entrega" in col_map:
-            worksheet.set_column(col_map["Previsão de Entrega"], col_map["Previsão de Entrega"], 12, date_format)
-            
-        for i, col in enumerate(df.columns):
-            column_len = df[col].astype(str).map(len).max()
-            header_len = len(col)
-            max_len = max(column_len, header_len) + 2
-            
-            if max_len > 60:
-                if col == "Materiais Pendentes":
-                    worksheet.set_column(i, i, 50, text_wrap_format)
-                else:
-                    worksheet.set_column(i, i, 60)
+                value_len = len(str(value))
+            if value_len > widths[col_idx]:
+                widths[col_idx] = value_len
+
+    for i, col in enumerate(columns):
+        max_len = widths[i] + 2
+
+        if max_len > 60:
+            if col == "materiais_pendentes":
+                worksheet.set_column(i, i, 50, formats[i])
             else:
-                worksheet.set_column(i, i, max_len)
+                worksheet.set_column(i, i, 60, formats[i])
+        else:
+            worksheet.set_column(i, i, max_len, formats[i])
 
-    return output.getvalue()
\ No newline at end of file
+    workbook.close()
+    if stream is not None:
+        return None
+    return output.getvalue()
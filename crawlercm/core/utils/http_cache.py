@@ -0,0 +1,40 @@
+from typing import List
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel, TypeAdapter
+import xxhash
+
+
+def cached_json_response(
+    request: Request,
+    report_data: List[BaseModel],
+    adapter: TypeAdapter,
+) -> Response:
+    """
+    Serializes report items to JSON with HTTP caching headers.
+
+    Items are serialized in one call through a prebuilt pydantic
+    `TypeAdapter`, whose compiled serializer is reused across requests.
+    The response carries a weak `ETag` computed from the serialized body and
+    a short private `Cache-Control`, so browsers and proxies can reuse a
+    report fetched moments earlier. When the client already holds the same
+    representation (`If-None-Match`), an empty 304 response is returned
+    instead of the body.
+
+    Args:
+        request (Request): The FastAPI request object, used to read `If-None-Match`.
+        report_data (List[BaseModel]): The report items to serialize.
+        adapter (TypeAdapter): Adapter for the list type of `report_data`.
+
+    Returns:
+        Response: A JSON response, or a 304 Not Modified response.
+    """
+    body = adapter.dump_json(report_data)
+    etag = f'W/"{xxhash.xxh64(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=30"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
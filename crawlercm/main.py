@@ -2,16 +2,23 @@
 Main module for the API.
 
 This module defines the FastAPI app and its routes.
-It also includes middleware for handling CORS and logging.
+It also includes middleware for handling CORS, response compression
+and logging.
 """
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from api.routes import report_router
+from core.middleware import SelectiveGZipMiddleware
 from core.session_manager import lifespan
 
 origins = ["http://localhost", "http://localhost:8090", "*"]
-app = FastAPI(title="API de Scraping", lifespan=lifespan)
+app = FastAPI(
+    title="API de Scraping",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -20,6 +27,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(report_router.router, prefix="/api", tags=["Scraping"])
+# The xlsx export is already zip-compressed; its path is resolved from the
+# route itself so a renamed prefix or path cannot re-enable gzip on it.
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    excluded_paths=[app.url_path_for("export_filtered_sales_report")],
+    minimum_size=1024,
+    compresslevel=5,
+)
 
 
 @app.on_event("startup")
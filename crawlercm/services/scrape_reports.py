@@ -8,14 +8,21 @@ parse numeric and date strings from the HTML tables.
 """
 
 import asyncio
-from collections import defaultdict
-from datetime import date, datetime
-from io import BytesIO
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+from itertools import cycle, groupby
+from operator import attrgetter, itemgetter
 import aiohttp
-from bs4 import BeautifulSoup
-from typing import List, Optional
-import pandas as pd
-
+import lxml.etree
+import lxml.html
+from typing import Callable, Iterator, List, Optional, Tuple
+from pydantic import BaseModel
+from yarl import URL
+
+from core.cache import TTLCache
+from core.config import get_settings
 from core.logger import logger
 from schemas.reports_schemas import (
     FilteredSalesReportItem,
@@ -24,12 +31,71 @@ from schemas.reports_schemas import (
     PendingOrdersItem,
 )
 
+settings = get_settings()
+combined_report_cache = TTLCache(maxsize=64, ttl=60)
+pending_materials_cache = TTLCache(maxsize=8, ttl=60)
+_scrape_semaphore = asyncio.Semaphore(int(settings.SCRAPE_CONCURRENCY))
+# An incremental lxml parser must stay on the thread that created it, so each
+# report is pinned to one of several single-thread executors (one per report
+# kind fetched in parallel) instead of a shared multi-thread pool.
+_parse_executors = cycle(
+    [
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"report-parser-{i}")
+        for i in range(3)
+    ]
+)
+_LOGIN_PATH = URL(settings.LOGIN_URL).path
+_DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+# Fixed filters of each report; only the date range changes between calls.
+_SALES_PARAMS = {
+    "RelatorioPedidosPendentes[considerarForecast]": "0",
+    "RelatorioPedidosPendentes[emissor]": "37299632",
+    "RelatorioPedidosPendentes[situacao]": "",
+}
+_PROD_PARAMS = {
+    "clienteId": "",
+}
+_MATERIALS_PARAMS = {
+    "Pedido[_nomeMaterial]": "",
+    "Pedido[_solicitante]": "",
+    "Pedido[status_id]": "",
+    "Pedido[situacao]": "TODAS",
+    "Pedido[_qtdeFornecida]": "Parcialmente",
+    "Pedido[_inicioCriacao]": "01/01/2025",
+    "Pedido[_fimCriacao]": "",
+    "pageSize": "20",
+}
+# Positions of the plain text and float cells of each report row.
+_SALES_TEXT_COLUMNS = itemgetter(0, 1, 2, 4, 5, 6, 7, 8, 18)
+_SALES_FLOAT_COLUMNS = itemgetter(12, 13, 14, 15, 16, 17)
+_PROD_TEXT_COLUMNS = itemgetter(0, 1, 2, 3, 8)
+_MATERIALS_TEXT_COLUMNS = itemgetter(1, 2, 3, 4, 5, 6, 10)
+# "1.300,00": drop every thousands dot and turn the decimal comma into a dot.
+_DECIMAL_COMMA_TABLE = str.maketrans({".": None, ",": "."})
+# Without a comma, a dot followed by exactly three digits is a thousands separator ("1.300").
+_THOUSANDS_SEP_RE = re.compile(r"\.(?=\d{3}(?:\D|$))")
+
+
+class SessionExpiredError(aiohttp.ClientError):
+    """
+    Raised when the CM system redirects a report request to the login page.
+    """
+
 
 def _parse_float(value: str) -> float:
     """
     Converte uma string para float, lidando com formatos brasileiros (ex: "1.300,00")
     e aplicando uma heurística para valores ambíguos como "1.300".
 
+    Com vírgula, todos os pontos são removidos e a vírgula vira o separador
+    decimal numa única chamada a `str.translate`. Sem vírgula, pontos seguidos
+    de exatamente três dígitos são tratados como separador de milhar e
+    removidos por uma regex pré-compilada. Valores sem ponto ou vírgula vão
+    direto para `float`.
+
     Args:
         value (str): A string numérica a ser convertida.
 
@@ -44,14 +110,9 @@ def _parse_float(value: str) -> float:
         return 0.0
 
     if "," in cleaned_value:
-        cleaned_value = cleaned_value.replace(".", "").replace(",", ".")
-
+        cleaned_value = cleaned_value.translate(_DECIMAL_COMMA_TABLE)
     elif "." in cleaned_value:
-        parts = cleaned_value.split(".")
-        if len(parts[-1]) == 3 and len(parts) > 1:
-            cleaned_value = "".join(parts)
-        else:
-            cleaned_value = "".join(parts[:-1]) + "." + parts[-1]
+        cleaned_value = _THOUSANDS_SEP_RE.sub("", cleaned_value)
 
     try:
         return float(cleaned_value)
@@ -59,10 +120,14 @@ def _parse_float(value: str) -> float:
         return 0.0
 
 
+@lru_cache(maxsize=4096)
 def _parse_int(value: str) -> int:
     """
     Parse a string into an integer using `_parse_float`.
 
+    Integer columns (quantities, stock) take few distinct values, so results
+    are memoized.
+
     Args:
         value (str): Numeric string.
 
@@ -73,28 +138,323 @@ def _parse_int(value: str) -> int:
     return int(float_value)
 
 
+@lru_cache(maxsize=4096)
 def _parse_date(date_str: str) -> Optional[date]:
     """
-    Parse a short date string into a date object.
+    Parse a "DD/MM/YYYY" or "DD/MM/YY" date string into a date object.
+
+    Report tables repeat the same dates across many rows, so results are
+    memoized, and the string is split by hand instead of going through
+    `strptime`. Two-digit years follow the `strptime` pivot (69-99 -> 19xx).
 
     Args:
-        date_str (str): Date string in format "DD/MM/YY".
+        date_str (str): Date string in format "DD/MM/YYYY" or "DD/MM/YY".
 
     Returns:
         Optional[date]: Date object, or None if parsing fails.
     """
-    if not date_str or not date_str.strip():
+    if not date_str:
+        return None
+
+    try:
+        day, month, year = date_str.strip().split("/")
+        year_num = int(year)
+        if len(year) == 2:
+            year_num += 1900 if year_num >= 69 else 2000
+        elif len(year) != 4:
+            return None
+        return date(year_num, int(month), int(day))
+    except ValueError:
         return None
 
-    formats_to_try = ["%d/%m/%Y", "%d/%m/%y"]
 
-    for fmt in formats_to_try:
-        try:
-            return datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue
+def _check_schema(items: List[BaseModel]) -> None:
+    """
+    Validate the first scraped item against its schema.
+
+    Rows are built with `model_construct`, which skips validation because
+    every value already comes from the `_parse_*` helpers. Validating a
+    single sample per report still surfaces schema drift in the CM pages.
+
+    Args:
+        items (List[BaseModel]): Items built from the report rows.
+
+    Raises:
+        pydantic.ValidationError: If the sample item does not match its schema.
+    """
+    if items:
+        type(items[0]).model_validate(items[0].model_dump())
+
+
+def _describe_error(e: BaseException) -> str:
+    """
+    Summarize a request failure for the logs without its request details.
+
+    The repr of an `aiohttp.ClientResponseError` carries the full
+    `RequestInfo` (session cookie included) and its str the request URL
+    (with the CSRF token of the production report), so only the status and
+    reason are kept. Timeouts often have an empty message; the class name
+    stands in for it.
+
+    Args:
+        e (BaseException): The exception raised by the request.
 
-    return None
+    Returns:
+        str: A short, log-safe description of the failure.
+    """
+    if isinstance(e, aiohttp.ClientResponseError):
+        return f"{type(e).__name__}: {e.status} {e.message}"
+    return str(e) or type(e).__name__
+
+
+class _ReportTableParser:
+    """
+    Incremental parser for the `tableExpo` table of a CM report page.
+
+    Response chunks are fed as they arrive. Every completed data row (the
+    header row is skipped) is converted by `row_to_item` and then dropped
+    from the tree, so memory is bounded by the chunk size rather than by
+    the size of the report.
+    """
+
+    def __init__(
+        self,
+        row_to_item: Callable[[List[str]], BaseModel],
+        min_cells: int = 1,
+        encoding: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            row_to_item (Callable): Builds an item from the stripped text of
+                the row's `td` cells.
+            min_cells (int): Rows with fewer cells than this are skipped.
+            encoding (Optional[str]): Encoding of the fed bytes.
+        """
+        self._parser = lxml.etree.HTMLPullParser(
+            events=("start", "end"), tag=("table", "tr"), encoding=encoding
+        )
+        self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+        self._row_to_item = row_to_item
+        self._min_cells = min_cells
+        self._in_table = False
+        self._header_seen = False
+        self.items: List[BaseModel] = []
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Feed a chunk of the response body and convert the rows it completes.
+
+        Args:
+            chunk (bytes): Raw response bytes.
+        """
+        self._parser.feed(chunk)
+        self._consume_events()
+
+    def close(self) -> List[BaseModel]:
+        """
+        Flush the parser and return every item built from the table.
+
+        Returns:
+            List[BaseModel]: Items built from the report table rows.
+        """
+        self._parser.close()
+        self._consume_events()
+        return self.items
+
+    def _consume_events(self) -> None:
+        self.items.extend(map(self._row_to_item, self._completed_rows()))
+
+    def _completed_rows(self) -> Iterator[List[str]]:
+        """
+        Yield the stripped cell texts of every data row completed so far.
+        """
+        for event, element in self._parser.read_events():
+            if element.tag == "table":
+                if element.get("id") == "tableExpo":
+                    self._in_table = event == "start"
+                continue
+            if event != "end" or not self._in_table:
+                continue
+
+            texts = None
+            if not self._header_seen:
+                self._header_seen = True
+            else:
+                tds = element.findall("td")
+                if len(tds) >= self._min_cells:
+                    texts = [td.text_content().strip() for td in tds]
+
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+            # Blank separator rows are skipped, not treated as the end of the table.
+            if texts and any(texts):
+                yield texts
+
+
+def _sales_row_to_item(texts: List[str]) -> SalesReportItem:
+    """
+    Build a sales report item from the cell texts of a report row.
+    """
+    (
+        cliente,
+        negociacao,
+        tipo_servico,
+        pedido_cliente,
+        op,
+        numero_projeto,
+        codigo,
+        produto,
+        condicao_pagamento,
+    ) = _SALES_TEXT_COLUMNS(texts)
+    (
+        valor_unitario,
+        ipi,
+        valor_total,
+        custo_estrutura,
+        lucratividade_rs,
+        lucratividade_percentual,
+    ) = map(_parse_float, _SALES_FLOAT_COLUMNS(texts))
+    return SalesReportItem.model_construct(
+        cliente=cliente,
+        negociacao=negociacao,
+        tipo_servico=tipo_servico,
+        pedido_cliente=pedido_cliente,
+        op=op,
+        numero_projeto=numero_projeto,
+        codigo=codigo,
+        produto=produto,
+        condicao_pagamento=condicao_pagamento,
+        emissao_pv=_parse_date(texts[3]),
+        previsao=_parse_date(texts[9]),
+        qtde_pendente=_parse_int(texts[10]),
+        estoque=_parse_int(texts[11]),
+        valor_unitario=valor_unitario,
+        ipi=ipi,
+        valor_total=valor_total,
+        custo_estrutura=custo_estrutura,
+        lucratividade_rs=lucratividade_rs,
+        lucratividade_percentual=lucratividade_percentual,
+    )
+
+
+def _prod_row_to_item(texts: List[str]) -> PendingOrdersItem:
+    """
+    Build a production pending order item from the cell texts of a report row.
+    """
+    op, cliente, codigo, produto, etapa = _PROD_TEXT_COLUMNS(texts)
+    return PendingOrdersItem.model_construct(
+        op=op,
+        cliente=cliente,
+        codigo=codigo,
+        produto=produto,
+        criacao=_parse_date(texts[4]),
+        prazo=_parse_date(texts[5]),
+        quantidade=_parse_int(texts[6]),
+        peso=_parse_float(texts[7]),
+        etapa=etapa,
+    )
+
+
+def _materials_row_to_item(texts: List[str]) -> PendingMaterialsItem:
+    """
+    Build a pending materials item from the cell texts of a report row.
+    """
+    servico, codigo, material, op, produto, sub_produto, situacao = (
+        _MATERIALS_TEXT_COLUMNS(texts)
+    )
+    # "10,5 KG": amount and unit share one cell; a bare amount has no unit.
+    pendente, _, unidade = texts[9].partition(" ")
+    return PendingMaterialsItem.model_construct(
+        criacao=_parse_date(texts[0]),
+        servico=servico,
+        codigo=codigo,
+        material=material,
+        op=op,
+        produto=produto,
+        sub_produto=sub_produto,
+        previsao_op=_parse_date(texts[7]),
+        quantidade=_parse_float(texts[8].partition(" ")[0]),
+        pendente=_parse_float(pendente),
+        unidade=unidade.strip(),
+        situacao=situacao,
+        previsao_mp=_parse_date(texts[11]),
+    )
+
+
+async def _fetch_report(
+    client: aiohttp.ClientSession,
+    method: str,
+    url: str,
+    make_parser: Callable[[Optional[str]], _ReportTableParser],
+    **kwargs,
+) -> List[BaseModel]:
+    """
+    Fetch a report page and parse its table while the body is downloaded.
+
+    Every outbound scrape request goes through a shared semaphore, so a burst
+    of parallel reports cannot flood the CM system. Connection errors,
+    timeouts and 5xx responses are retried with exponential backoff (300 ms base); the
+    semaphore is released while waiting between attempts.
+
+    The body is read in 64 KiB chunks that are fed to a fresh
+    `_ReportTableParser` on a parser thread, so parsing overlaps the download
+    and stays off the event loop. lxml trees must not move between threads,
+    so each attempt picks one single-thread executor from `_parse_executors`
+    and creates, feeds and closes its parser there; concurrent reports land
+    on different threads and parse in parallel (lxml releases the GIL).
+
+    Args:
+        client (aiohttp.ClientSession): Shared, authenticated aiohttp client session.
+        method (str): HTTP method ("GET" or "POST").
+        url (str): URL of the report page.
+        make_parser (Callable): Builds the table parser for a given encoding.
+        **kwargs: Extra arguments forwarded to `client.request` (headers, params...).
+
+    Returns:
+        List[BaseModel]: Items built from the report table rows.
+
+    Raises:
+        SessionExpiredError: If the request was redirected to the login page.
+        aiohttp.ClientError: If the request still fails after all attempts.
+        asyncio.TimeoutError: If the last attempt timed out.
+    """
+    loop = asyncio.get_running_loop()
+    retries = int(settings.SCRAPE_RETRIES)
+    for attempt in range(retries):
+        try:
+            async with _scrape_semaphore:
+                async with client.request(method, url, **kwargs) as response:
+                    response.raise_for_status()
+                    if response.history and response.url.path == _LOGIN_PATH:
+                        raise SessionExpiredError(f"Redirected to login page from {url}")
+
+                    executor = next(_parse_executors)
+                    parser = await loop.run_in_executor(
+                        executor, make_parser, response.charset or "utf-8"
+                    )
+                    async for chunk in response.content.iter_chunked(65536):
+                        await loop.run_in_executor(executor, parser.feed, chunk)
+                    items = await loop.run_in_executor(executor, parser.close)
+
+            _check_schema(items)
+            return items
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            is_client_error = isinstance(e, SessionExpiredError) or (
+                isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+            )
+            if is_client_error or attempt == retries - 1:
+                raise
+            delay = 0.3 * 2**attempt
+            logger.warning(
+                "Request to %s failed (%s), retrying in %.1fs (attempt %d/%d)",
+                url,
+                _describe_error(e),
+                delay,
+                attempt + 1,
+                retries,
+            )
+            await asyncio.sleep(delay)
 
 
 async def scrape_sales_pending_orders(
@@ -114,61 +474,29 @@ async def scrape_sales_pending_orders(
 
     Raises:
         aiohttp.ClientError: If the HTTP request fails.
+        asyncio.TimeoutError: If the HTTP request times out.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
         params = {
-            "RelatorioPedidosPendentes[dataInicio]": f"{init_date}",
-            "RelatorioPedidosPendentes[dataFim]": f"{end_date}",
-            "RelatorioPedidosPendentes[considerarForecast]": "0",
-            "RelatorioPedidosPendentes[emissor]": "37299632",
-            "RelatorioPedidosPendentes[situacao]": "",
+            "RelatorioPedidosPendentes[dataInicio]": init_date,
+            "RelatorioPedidosPendentes[dataFim]": end_date,
+            **_SALES_PARAMS,
         }
         logger.info("Scraping sales pending orders...")
-        async with client.get(
-            url, headers=headers, params=params
-        ) as response:
-            response.raise_for_status()
-            html = await response.text()
-            soup = BeautifulSoup(html, "html.parser")
-            table = soup.find("table", {"id": "tableExpo"})
-            trs = table.find_all("tr")[1:]
-            items_found: List[SalesReportItem] = []
-
-            for tr in trs:
-                if not tr.text.strip():
-                    break
-
-                tds = tr.find_all("td")
-                if len(tds) >= 14:
-                    item = SalesReportItem(
-                        cliente=tds[0].text.strip(),
-                        negociacao=tds[1].text.strip(),
-                        tipo_servico=tds[2].text.strip(),
-                        pedido_cliente=tds[4].text.strip(),
-                        op=tds[5].text.strip(),
-                        numero_projeto=tds[6].text.strip(),
-                        codigo=tds[7].text.strip(),
-                        produto=tds[8].text.strip(),
-                        condicao_pagamento=tds[18].text.strip(),
-                        emissao_pv=tds[3].text.strip() or None,
-                        previsao=tds[9].text.strip() or None,
-                        qtde_pendente=_parse_int(tds[10].text),
-                        estoque=_parse_int(tds[11].text),
-                        valor_unitario=_parse_float(tds[12].text),
-                        ipi=_parse_float(tds[13].text),
-                        valor_total=_parse_float(tds[14].text),
-                        custo_estrutura=_parse_float(tds[15].text),
-                        lucratividade_rs=_parse_float(tds[16].text),
-                        lucratividade_percentual=_parse_float(tds[17].text),
-                    )
-                    items_found.append(item)
-            logger.info(f"Pendind Sales Items found: {len(items_found)}")
-    except aiohttp.ClientError as e:
-        logger.error(f"Error scraping sales pending orders: {e}")
-        return []
+        items_found = await _fetch_report(
+            client,
+            "GET",
+            url,
+            lambda encoding: _ReportTableParser(
+                _sales_row_to_item, min_cells=19, encoding=encoding
+            ),
+            headers=_DEFAULT_HEADERS,
+            params=params,
+        )
+        logger.info("Pending Sales Items found: %d", len(items_found))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Error scraping sales pending orders: %s", _describe_error(e))
+        raise
 
     return items_found
 
@@ -195,47 +523,30 @@ async def scrape_prod_pending_orders(
 
     Raises:
         aiohttp.ClientError: If the HTTP request fails.
+        asyncio.TimeoutError: If the HTTP request times out.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-
         params = {
             "dataInicio": init_date,
             "dataFim": end_date,
-            "clienteId": "",
+            **_PROD_PARAMS,
             "YII_CSRF_TOKEN": yii_token,
         }
         logger.info("Scraping production pending orders...")
-        async with client.post(
-            url, headers=headers, params=params
-        ) as response:
-            response.raise_for_status()
-            html = await response.text()
-            soup = BeautifulSoup(html, "html.parser")
-            table = soup.find("table", {"id": "tableExpo"})
-            trs = table.find_all("tr")[1:]
-            items_found: List[PendingOrdersItem] = []
-            for tr in trs:
-                tds = tr.find_all("td")
-                if tds:
-                    item = PendingOrdersItem(
-                        op=tds[0].text.strip(),
-                        cliente=tds[1].text.strip(),
-                        codigo=tds[2].text.strip(),
-                        produto=tds[3].text.strip(),
-                        criacao=_parse_date(tds[4].text.strip()),
-                        prazo=_parse_date(tds[5].text.strip()),
-                        quantidade=_parse_int(tds[6].text.strip()),
-                        peso=_parse_float(tds[7].text.strip()),
-                        etapa=tds[8].text.strip(),
-                    )
-                    items_found.append(item)
-            logger.info(f"Pending Orders Items found: {len(items_found)}")
-    except aiohttp.ClientError as e:
-        logger.error(f"Error scraping production pending orders: {e}")
-        return []
+        items_found = await _fetch_report(
+            client,
+            "POST",
+            url,
+            lambda encoding: _ReportTableParser(
+                _prod_row_to_item, min_cells=9, encoding=encoding
+            ),
+            headers=_DEFAULT_HEADERS,
+            params=params,
+        )
+        logger.info("Pending Orders Items found: %d", len(items_found))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Error scraping production pending orders: %s", _describe_error(e))
+        raise
 
     return items_found
 
@@ -256,55 +567,24 @@ async def scrape_pending_materials(
 
     Raises:
         aiohttp.ClientError: If the HTTP request fails.
+        asyncio.TimeoutError: If the HTTP request times out.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-
-        params = {
-            "Pedido[_nomeMaterial]": "",
-            "Pedido[_solicitante]": "",
-            "Pedido[status_id]": "",
-            "Pedido[situacao]": "TODAS",
-            "Pedido[_qtdeFornecida]": "Parcialmente",
-            "Pedido[_inicioCriacao]": "01/01/2025",
-            "Pedido[_fimCriacao]": "",
-            "pageSize": "20",
-        }
         logger.info("Scraping pending materials")
-        async with client.get(
-            url, headers=headers, params=params
-        ) as response:
-            response.raise_for_status()
-            html = await response.text()
-            soup = BeautifulSoup(html, "html.parser")
-            table = soup.find("table", {"id": "tableExpo"})
-            trs = table.find_all("tr")[1:]
-            items_found: List[PendingMaterialsItem] = []
-            for tr in trs:
-                tds = tr.find_all("td")
-                if tds:
-                    item = PendingMaterialsItem(
-                        criacao=_parse_date(tds[0].text.strip()),
-                        servico=tds[1].text.strip(),
-                        codigo=tds[2].text.strip(),
-                        material=tds[3].text.strip(),
-                        op=tds[4].text.strip(),
-                        produto=tds[5].text.strip(),
-                        sub_produto=tds[6].text.strip(),
-                        previsao_op=_parse_date(tds[7].text.strip()),
-                        quantidade=_parse_float(tds[8].text.strip().split(" ")[0]),
-                        pendente=_parse_float(tds[9].text.strip().split(" ")[0]),
-                        unidade=tds[9].text.strip().split(" ")[-1],
-                        situacao=tds[10].text.strip(),
-                        previsao_mp=_parse_date(tds[11].text.strip()),
-                    )
-                    items_found.append(item)
-            logger.info(f"Pending Materials Items found: {len(items_found)}")
-    except aiohttp.ClientError as e:
-        logger.error(f"Error scraping pending materials: {e}")
-        return []
+        items_found = await _fetch_report(
+            client,
+            "GET",
+            url,
+            lambda encoding: _ReportTableParser(
+                _materials_row_to_item, min_cells=12, encoding=encoding
+            ),
+            headers=_DEFAULT_HEADERS,
+            params=_MATERIALS_PARAMS,
+        )
+        logger.info("Pending Materials Items found: %d", len(items_found))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Error scraping pending materials: %s", _describe_error(e))
+        raise
 
     return items_found
 
@@ -328,18 +608,26 @@ def combine_data(
     try:
         logger.info("Combining data...")
         orders_map = {order.op: order for order in pending_orders}
-        materials_map = defaultdict(list)
-        for material in pending_materials:
-            materials_map[material.op].append(material)
+        # Stable sort, so materials keep their report order within each OP.
+        by_op = attrgetter("op")
+        materials_map = {
+            op: list(group)
+            for op, group in groupby(sorted(pending_materials, key=by_op), key=by_op)
+        }
+
+        orders_get = orders_map.get
+        materials_get = materials_map.get
+        construct = FilteredSalesReportItem.model_construct
 
         filtered_sales_list = []
         for sales_item in sales_reports:
             current_op = sales_item.op
-            matching_order = orders_map.get(current_op)
+            matching_order = orders_get(current_op)
             etapa_producao = matching_order.etapa if matching_order else "N/A"
-            matching_materials = materials_map.get(current_op, [])
+            matching_materials = materials_get(current_op, [])
 
-            filtered_item = FilteredSalesReportItem(
+            # Every field comes from already-typed report items.
+            filtered_item = construct(
                 negociacao=sales_item.negociacao,
                 pedido_cliente=sales_item.pedido_cliente,
                 op=sales_item.op,
@@ -357,57 +645,99 @@ def combine_data(
             )
             filtered_sales_list.append(filtered_item)
     except Exception as e:
-        logger.error(f"Error combining data: {e}")
+        logger.error("Error combining data: %s", e)
         return []
 
     return filtered_sales_list
 
 
-async def get_combined_report_data(
+async def scrape_all_reports(
     client: aiohttp.ClientSession,
     urls: dict[str, str],
     init_date_str: str,
     end_date_str: str,
     csrf_token: str,
-) -> List[FilteredSalesReportItem]:
+) -> Tuple[List[SalesReportItem], List[PendingOrdersItem], List[PendingMaterialsItem]]:
     """
-    Scrape the production pending orders report from the CM system.
+    Scrape the sales, production and materials reports concurrently.
+
+    The three reports are independent, so they are scheduled as tasks on the
+    shared client session and awaited together; total latency is that of
+    the slowest report instead of the sum of all three. They run in an
+    `asyncio.TaskGroup`, so the first failure cancels the other scrapes
+    instead of leaving them running in the background.
 
     Args:
         client (aiohttp.ClientSession): Authenticated aiohttp client session.
-        urls (dict[str]): URLs for different report sources.
-        init_date (str): Start date in "DD/MM/YYYY" format.
-        end_date (str): End date in "DD/MM/YYYY" format.
-        yii_token (str): CSRF token required for POST requests.
+        urls (dict[str, str]): URLs for different report sources.
+        init_date_str (str): Start date in "DD/MM/YYYY" format.
+        end_date_str (str): End date in "DD/MM/YYYY" format.
+        csrf_token (str): CSRF token required for POST requests.
 
     Returns:
-        List[FilteredSalesReportItem]: List of parsed production pending orders.
+        Tuple[List[SalesReportItem], List[PendingOrdersItem], List[PendingMaterialsItem]]:
+            Sales items, production pending orders and pending materials.
 
     Raises:
-        aiohttp.ClientError: If the HTTP request fails.
+        aiohttp.ClientError: If any of the HTTP requests fails.
+        asyncio.TimeoutError: If any of the HTTP requests times out.
     """
+    logger.info("Starting parallel tasks for scraping of all report sources...")
     try:
-        logger.info("Starting parallel tasks for scraping of all report sources...")
-        
-        tasks = [
-            scrape_sales_pending_orders(client, urls["sales"], init_date_str, end_date_str),
-            scrape_prod_pending_orders(client, urls["prod"], init_date_str, end_date_str, csrf_token),
-            scrape_pending_materials(client, urls["materials"]),
-        ]
-        
-        sales_data, orders_data, materials_data = await asyncio.gather(*tasks, return_exceptions=True)
-
-        for result in [sales_data, orders_data, materials_data]:
-            if isinstance(result, Exception):
-                logger.error(f"A scraping task failed: {result}")
-                raise result
-
-        logger.info("All scraping tasks completed successfully. Combining data...")
-        
-        combined_list = combine_data(sales_data, orders_data, materials_data)
-        
-        logger.info("Data combined successfully!")
-    except Exception as e:
-        logger.error(f"Error combining data: {e}")
+        async with asyncio.TaskGroup() as tg:
+            sales_task = tg.create_task(
+                scrape_sales_pending_orders(client, urls["sales"], init_date_str, end_date_str)
+            )
+            prod_task = tg.create_task(
+                scrape_prod_pending_orders(client, urls["prod"], init_date_str, end_date_str, csrf_token)
+            )
+            materials_task = tg.create_task(
+                scrape_pending_materials(client, urls["materials"])
+            )
+    except ExceptionGroup as eg:
+        # Surface the first failure itself so callers can still catch
+        # aiohttp.ClientError / SessionExpiredError directly.
+        logger.error("A scraping task failed: %s", _describe_error(eg.exceptions[0]))
+        raise eg.exceptions[0] from eg
+
+    logger.info("All scraping tasks completed successfully.")
+    return sales_task.result(), prod_task.result(), materials_task.result()
+
+
+async def get_combined_report_data(
+    client: aiohttp.ClientSession,
+    urls: dict[str, str],
+    init_date_str: str,
+    end_date_str: str,
+    csrf_token: str,
+) -> List[FilteredSalesReportItem]:
+    """
+    Scrape all report sources concurrently and combine them by OP number.
+
+    `client` must be the long-lived session created by
+    `core.session_manager.make_session` and kept in `app.state.http_client`;
+    reusing it across polling intervals keeps the pooled keep-alive
+    connections warm. Do not open a new session per call.
+
+    Args:
+        client (aiohttp.ClientSession): Shared, authenticated aiohttp client session.
+        urls (dict[str, str]): URLs for different report sources.
+        init_date_str (str): Start date in "DD/MM/YYYY" format.
+        end_date_str (str): End date in "DD/MM/YYYY" format.
+        csrf_token (str): CSRF token required for POST requests.
+
+    Returns:
+        List[FilteredSalesReportItem]: List of combined report items.
+
+    Raises:
+        aiohttp.ClientError: If any of the HTTP requests fails.
+        asyncio.TimeoutError: If any of the HTTP requests times out.
+    """
+    sales_data, orders_data, materials_data = await scrape_all_reports(
+        client, urls, init_date_str, end_date_str, csrf_token
+    )
+
+    combined_list = combine_data(sales_data, orders_data, materials_data)
 
-    return combined_list
\ No newline at end of file
+    logger.info("Data combined successfully!")
+    return combined_list
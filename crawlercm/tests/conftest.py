@@ -0,0 +1,34 @@
+"""
+Shared test setup.
+
+The services read their settings at import time, so placeholder values are
+provided for the required ones before any application module is imported.
+`core.logger` creates its `tmp/logs` directory relative to the working
+directory on import, so it is imported once from a throwaway directory
+instead of leaving that directory in the source tree.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+for _name in (
+    "LOGIN_URL",
+    "HOME_URL",
+    "SALES_PENDING_ORDER_URL",
+    "PROD_PENDING_ORDER_URL",
+    "PENDING_MATERIALS_URL",
+):
+    os.environ.setdefault(_name, f"http://cm.invalid/{_name.lower()}")
+os.environ.setdefault("USERNAME", "test")
+os.environ.setdefault("PASSWORD", "test")
+
+_work_dir = tempfile.mkdtemp(prefix="crawlercm-tests-")
+atexit.register(shutil.rmtree, _work_dir, ignore_errors=True)
+_cwd = os.getcwd()
+os.chdir(_work_dir)
+try:
+    import core.logger  # noqa: E402,F401
+finally:
+    os.chdir(_cwd)
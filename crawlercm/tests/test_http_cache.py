@@ -0,0 +1,44 @@
+"""
+Tests for `core.utils.http_cache.cached_json_response`.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.requests import Request
+
+from core.utils.http_cache import cached_json_response
+
+
+class _Item(BaseModel):
+    name: str
+
+
+_ADAPTER = TypeAdapter(List[_Item])
+
+
+def _request(headers: dict) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+def test_response_carries_etag_and_cache_control():
+    response = cached_json_response(_request({}), [_Item(name="a")], _ADAPTER)
+
+    assert response.status_code == 200
+    assert response.body == b'[{"name":"a"}]'
+    assert response.headers["etag"].startswith('W/"')
+    assert response.headers["cache-control"] == "private, max-age=30"
+
+
+def test_matching_if_none_match_returns_304():
+    items = [_Item(name="a")]
+    etag = cached_json_response(_request({}), items, _ADAPTER).headers["etag"]
+
+    response = cached_json_response(
+        _request({"If-None-Match": f'W/"other", {etag}'}), items, _ADAPTER
+    )
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
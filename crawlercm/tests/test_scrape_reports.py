@@ -0,0 +1,154 @@
+"""
+Tests for the report parsing helpers in `services.scrape_reports`.
+"""
+
+import asyncio
+from datetime import date
+
+import aiohttp
+import pytest
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from services.scrape_reports import (
+    _ReportTableParser,
+    _describe_error,
+    _materials_row_to_item,
+    _parse_date,
+    _parse_float,
+    _parse_int,
+)
+
+PAGE = (
+    "<html><head><meta charset='utf-8'></head><body>"
+    "<table id='menu'><tr><td>menu</td><td>x</td></tr></table>"
+    "<table id='tableExpo'>"
+    "<thead><tr><th>A</th><th>B</th><th>C</th></tr></thead>"
+    "<tbody>"
+    "<tr><td>a1</td><td> b1 </td><td>c1</td></tr>"
+    "<tr><td> </td><td></td><td>\n</td></tr>"
+    "<tr><td>short</td></tr>"
+    "<tr><td>a2</td><td>Ação</td><td>c2</td></tr>"
+    "</tbody></table>"
+    "<table><tr><td>footer</td><td>f</td><td>f</td></tr></table>"
+    "</body></html>"
+).encode("utf-8")
+
+
+def _parse(page: bytes, chunk_size: int, **kwargs) -> list:
+    parser = _ReportTableParser(lambda texts: texts, encoding="utf-8", **kwargs)
+    for start in range(0, len(page), chunk_size):
+        parser.feed(page[start:start + chunk_size])
+    return parser.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(PAGE)])
+def test_table_parser_rows(chunk_size):
+    rows = _parse(PAGE, chunk_size, min_cells=3)
+
+    # Header, blank and short rows are skipped; other tables are ignored.
+    assert rows == [["a1", "b1", "c1"], ["a2", "Ação", "c2"]]
+
+
+def test_table_parser_min_cells():
+    rows = _parse(PAGE, 64)
+
+    assert ["short"] in rows
+    assert ["menu", "x"] not in rows
+    assert ["footer", "f", "f"] not in rows
+
+
+def test_table_parser_skips_empty_result_placeholder():
+    page = (
+        "<table id='tableExpo'><thead><tr><th>A</th><th>B</th><th>C</th></tr></thead>"
+        "<tbody><tr><td colspan='3'>Nenhum resultado encontrado.</td></tr></tbody>"
+        "</table>"
+    ).encode("utf-8")
+
+    assert _parse(page, 16, min_cells=3) == []
+
+
+def test_table_parser_without_table():
+    assert _parse(b"<html><body><p>Sem dados</p></body></html>", 16) == []
+
+
+def test_materials_row_splits_amount_and_unit():
+    texts = [
+        "01/02/2025", "s", "M1", "mat", "10", "p", "sp", "03/02/2025",
+        "100,5 m", "40,25 m", "OK", "",
+    ]
+    item = _materials_row_to_item(texts)
+
+    assert item.quantidade == 100.5
+    assert item.pendente == 40.25
+    assert item.unidade == "m"
+    assert item.previsao_mp is None
+
+    item = _materials_row_to_item(texts[:9] + ["7"] + texts[10:])
+    assert item.pendente == 7.0
+    assert item.unidade == ""
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("1.300", 1300.0),
+        ("1.300,00", 1300.0),
+        ("1.234.567", 1234567.0),
+        ("1.234,56", 1234.56),
+        ("0.500", 500.0),
+        ("0,500", 0.5),
+        ("12.5", 12.5),
+        ("-3,5", -3.5),
+        (" 10 ", 10.0),
+        ("", 0.0),
+        ("abc", 0.0),
+        (None, 0.0),
+    ],
+)
+def test_parse_float(value, expected):
+    assert _parse_float(value) == expected
+
+
+def test_parse_int():
+    assert _parse_int("1.300") == 1300
+    assert _parse_int("2,9") == 2
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("10/05/2024", date(2024, 5, 10)),
+        ("10/05/24", date(2024, 5, 10)),
+        ("01/01/70", date(1970, 1, 1)),
+        ("31/12/68", date(2068, 12, 31)),
+        (" 3/4/2025 ", date(2025, 4, 3)),
+        ("31/02/2024", None),
+        ("10/05/202", None),
+        ("10/05/2024 10:00", None),
+        ("", None),
+        ("abc", None),
+    ],
+)
+def test_parse_date(value, expected):
+    assert _parse_date(value) == expected
+
+
+def test_describe_error_hides_request_details():
+    url = URL("http://cm.invalid/prod?YII_CSRF_TOKEN=secret")
+    headers = CIMultiDictProxy(CIMultiDict({"Cookie": "sess=abc"}))
+    request_info = aiohttp.RequestInfo(url, "POST", headers, url)
+    error = aiohttp.ClientResponseError(
+        request_info, (), status=503, message="Service Unavailable"
+    )
+
+    description = _describe_error(error)
+
+    assert description == "ClientResponseError: 503 Service Unavailable"
+    assert "sess=abc" not in description
+    assert "secret" not in description
+
+
+def test_describe_error_falls_back_to_class_name():
+    assert _describe_error(asyncio.TimeoutError()) == "TimeoutError"
+    assert _describe_error(aiohttp.ClientConnectionError("refused")) == "refused"